@@ -0,0 +1,69 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from search.embeddings import (
+    embed_batch,
+    embed_text,
+    get_embedding_model,
+    get_onnx_embedding_model,
+    warmup_model,
+)
+
+QUERIES = [
+    "London Beer Flood",
+    "alcoholic beverage disaster in England",
+    "python programming language",
+    "large constricting reptiles",
+    "who painted the ceiling of the sistine chapel",
+    "history of the printing press in europe",
+    "how do vaccines train the immune system",
+    "largest desert in the world",
+]
+
+
+def benchmark(model, reference, repeats, batch_size):
+    """Single-query latency percentiles, batch throughput and agreement with the reference vectors."""
+    warmup_model(model)
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            embed_text(model, query)
+            latencies.append(time.perf_counter() - start)
+
+    texts = QUERIES * (batch_size // len(QUERIES) + 1)
+    start = time.perf_counter()
+    embed_batch(model, texts, batch_size=batch_size)
+    throughput = len(texts) / (time.perf_counter() - start)
+
+    vectors = embed_batch(model, QUERIES)
+    cosine = np.sum(vectors * reference, axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    return p50, p95, throughput, cosine.min()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compare query encoder backends")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime threads per query")
+    parser.add_argument("--repeats", type=int, default=25, help="times to encode every query")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    reference_model = get_embedding_model()
+    reference = embed_batch(reference_model, QUERIES)
+    backends = {
+        "torch (float32)": reference_model,
+        "onnx (float32)": get_onnx_embedding_model(quantize=False, num_threads=args.threads),
+        "onnx (int8)": get_onnx_embedding_model(quantize=True, num_threads=args.threads),
+    }
+
+    print(f"{'backend':<18} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>9} {'min cosine':>11}")
+    for name, model in backends.items():
+        p50, p95, throughput, cosine = benchmark(model, reference, args.repeats, args.batch_size)
+        print(f"{name:<18} {p50:>8.2f} {p95:>8.2f} {throughput:>9.0f} {cosine:>11.5f}")
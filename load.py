@@ -1,21 +1,25 @@
 from collections.abc import Generator
 
-from datasets import load_dataset
-
 from search.documents import Abstract
 
 DATASET: str = "wikimedia/wikipedia"
 DATASET_CONFIG: str = "20231101.en"
 
 
-def load_documents() -> tuple[int, Generator[Abstract, None, None]]:
+def load_documents(full_text: bool = False) -> tuple[int, Generator[Abstract, None, None]]:
     """Load Wikipedia abstracts from HuggingFace.
 
     Returns (total, iterator) so callers can create fixed-size structures
     (like a memmap) without materializing all documents into memory.
     The HF Dataset is Arrow-backed and memory-mapped, so iterating over it
     doesn't load the full dataset into RAM.
+
+    With full_text=True every Abstract also carries the whole article in its
+    `text` field, for chunking into passages.
     """
+    # datasets is slow to import, and we don't need it when a saved index exists
+    from datasets import load_dataset
+
     ds = load_dataset(DATASET, DATASET_CONFIG, split="train")
 
     def _generate() -> Generator[Abstract, None, None]:
@@ -25,6 +29,8 @@ def load_documents() -> tuple[int, Generator[Abstract, None, None]]:
             # extract first paragraph as abstract
             text: str = row["text"]
             abstract = text.split("\n\n")[0] if text else ""
-            yield Abstract(ID=doc_id, title=title, url=url, abstract=abstract)
+            yield Abstract(
+                ID=doc_id, title=title, url=url, abstract=abstract, text=text if full_text else ""
+            )
 
     return len(ds), _generate()
@@ -24,3 +24,12 @@ if __name__ == "__main__":
     index.search("London Beer Flood", search_type="OR")
     index.search("London Beer Flood", search_type="AND", rank=True)
     index.search("London Beer Flood", search_type="OR", rank=True)
+
+    # compile to a sparse document-term matrix for vectorized ranking
+    index.compile()
+    index.search("London Beer Flood", search_type="AND", rank=True)
+    index.search("London Beer Flood", search_type="OR", rank=True, k=10)
+
+    # highlighted snippets for the top 10 only
+    for document, score, snippet in index.search("London Beer Flood", search_type="OR", rank=True, k=10, snippets=True):
+        print(f"  {score:.4f} | {document.title}: {snippet}")
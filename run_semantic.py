@@ -1,3 +1,4 @@
+import argparse
 import itertools
 import json
 import logging
@@ -8,7 +9,14 @@ from pathlib import Path
 import numpy as np
 
 from load import load_documents
-from search.embeddings import embed_batch, embed_text, get_embedding_model
+from search.chunking import chunk_document
+from search.embeddings import (
+    embed_batch,
+    embed_text,
+    get_embedding_model,
+    get_onnx_embedding_model,
+    warmup_model,
+)
 from search.timing import timing
 from search.vector_index import VectorIndex
 
@@ -21,6 +29,49 @@ BATCH_SIZE = 256
 CHECKPOINT_SIZE = 10_000
 INDEX_PATH = "data/vector_index"
 CHECKPOINT_DIR = Path("data/checkpoints")
+PASSAGE_INDEX_PATH = "data/passage_index"
+PASSAGE_CHECKPOINT_DIR = CHECKPOINT_DIR / "passages"
+
+
+def save_docs_checkpoint(docs_path, chunk_docs, offset):
+    # Save doc metadata per-chunk so we never need all docs in memory.
+    # On resume these are read back from disk to assemble the final JSON.
+    # Write to a temp file then rename so a crash mid-write can't leave
+    # a corrupt file that blocks resume.
+    chunk_docs_data = {
+        str(offset + j): {"ID": d.ID, "title": d.title, "abstract": d.abstract, "url": d.url}
+        for j, d in enumerate(chunk_docs)
+    }
+    with tempfile.NamedTemporaryFile("w", dir=docs_path.parent, suffix=".json", delete=False) as f:
+        json.dump(chunk_docs_data, f)
+        tmp_path = Path(f.name)
+    tmp_path.rename(docs_path)
+
+
+def save_array_checkpoint(path, array):
+    # Save via temp file + rename for crash safety
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".npy", delete=False) as f:
+        np.save(f, array)
+        tmp_path = Path(f.name)
+    tmp_path.rename(path)
+
+
+def normalize_float16(vectors):
+    # Normalize in float32 for numerical stability, then downcast to float16
+    # to halve disk/memory usage. The precision loss is negligible for ranking.
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float16)
+
+
+def assemble_docs_json(checkpoint_dir, total, index_path):
+    # Assemble final document metadata from per-chunk JSON files
+    all_docs_data = {}
+    for i in range(0, total, CHECKPOINT_SIZE):
+        with open(checkpoint_dir / f"chunk_{i}.json") as f:
+            all_docs_data.update(json.load(f))
+    with open(f"{index_path}.json", "w") as f:
+        json.dump(all_docs_data, f)
 
 
 @timing
@@ -43,19 +94,8 @@ def build_vector_index(documents, total, model):
         # Abstract objects at a time instead of all 6.4M.
         chunk_docs = list(itertools.islice(documents, chunk_size))
 
-        # Save doc metadata per-chunk so we never need all docs in memory.
-        # On resume these are read back from disk to assemble the final JSON.
-        # Write to a temp file then rename so a crash mid-write can't leave
-        # a corrupt file that blocks resume.
         if not docs_path.exists():
-            chunk_docs_data = {
-                str(i + j): {"ID": d.ID, "title": d.title, "abstract": d.abstract, "url": d.url}
-                for j, d in enumerate(chunk_docs)
-            }
-            with tempfile.NamedTemporaryFile("w", dir=CHECKPOINT_DIR, suffix=".json", delete=False) as f:
-                json.dump(chunk_docs_data, f)
-                tmp_path = Path(f.name)
-            tmp_path.rename(docs_path)
+            save_docs_checkpoint(docs_path, chunk_docs, i)
 
         t0 = time.perf_counter()
         if chunk_path.exists():
@@ -68,11 +108,7 @@ def build_vector_index(documents, total, model):
             chunk_vectors = embed_batch(model, texts, batch_size=BATCH_SIZE, show_progress=True)
             elapsed = time.perf_counter() - t0
             logger.info(f"  Chunk {chunk_num}/{num_chunks}: embedded in {elapsed:.1f}s")
-            # Save raw embeddings via temp file + rename for crash safety
-            with tempfile.NamedTemporaryFile(dir=CHECKPOINT_DIR, suffix=".npy", delete=False) as f:
-                np.save(f, chunk_vectors)
-                tmp_path = Path(f.name)
-            tmp_path.rename(chunk_path)
+            save_array_checkpoint(chunk_path, chunk_vectors)
 
         total_elapsed = time.perf_counter() - build_start
         logger.info(f"  Total elapsed: {total_elapsed:.1f}s")
@@ -85,23 +121,13 @@ def build_vector_index(documents, total, model):
                 shape=(total, chunk_vectors.shape[1]),
             )
 
-        # Normalize in float32 for numerical stability, then downcast to float16
-        # to halve disk/memory usage. The precision loss is negligible for ranking.
-        norms = np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
-        norms[norms == 0] = 1
-        matrix[i:end] = (chunk_vectors / norms).astype(np.float16)
+        matrix[i:end] = normalize_float16(chunk_vectors)
 
     if matrix is not None:
         matrix.flush()
         del matrix
 
-    # Assemble final document metadata from per-chunk JSON files
-    all_docs_data = {}
-    for i in range(0, total, CHECKPOINT_SIZE):
-        with open(CHECKPOINT_DIR / f"chunk_{i}.json") as f:
-            all_docs_data.update(json.load(f))
-    with open(f"{INDEX_PATH}.json", "w") as f:
-        json.dump(all_docs_data, f)
+    assemble_docs_json(CHECKPOINT_DIR, total, INDEX_PATH)
 
     # Load the finished index using memory-mapped I/O — the matrix stays on disk
     # and the OS pages in data as needed during search.
@@ -110,21 +136,131 @@ def build_vector_index(documents, total, model):
     return index
 
 
+@timing
+def build_passage_index(documents, total, model):
+    """Build a multi-vector index over overlapping passages of the full articles.
+
+    The number of passages per document isn't known up front, so this runs in
+    two passes: first embed and checkpoint the passages chunk by chunk (just
+    like build_vector_index), then copy the checkpoints into a memmap sized
+    to the total number of passages.
+    """
+    logger.info(f"Building passage index for {total} documents...")
+    PASSAGE_CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    Path(PASSAGE_INDEX_PATH).parent.mkdir(parents=True, exist_ok=True)
+
+    num_chunks = (total + CHECKPOINT_SIZE - 1) // CHECKPOINT_SIZE
+    build_start = time.perf_counter()
+
+    for chunk_num, i in enumerate(range(0, total, CHECKPOINT_SIZE), 1):
+        chunk_path = PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.npy"
+        rows_path = PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.rows.npy"
+        docs_path = PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.json"
+        end = min(i + CHECKPOINT_SIZE, total)
+
+        chunk_docs = list(itertools.islice(documents, end - i))
+        if not docs_path.exists():
+            save_docs_checkpoint(docs_path, chunk_docs, i)
+
+        if chunk_path.exists() and rows_path.exists():
+            logger.info(f"  Chunk {chunk_num}/{num_chunks}: checkpoint exists ({end}/{total} docs)")
+            continue
+
+        t0 = time.perf_counter()
+        passages = []
+        row_docs = []
+        for j, d in enumerate(chunk_docs):
+            for passage in chunk_document(d):
+                passages.append(passage)
+                row_docs.append(i + j)
+        logger.info(
+            f"  Chunk {chunk_num}/{num_chunks}: embedding {len(passages):,} passages "
+            f"of docs {i:,}–{end:,} of {total:,}"
+        )
+        chunk_vectors = embed_batch(model, passages, batch_size=BATCH_SIZE, show_progress=True)
+        logger.info(f"  Chunk {chunk_num}/{num_chunks}: embedded in {time.perf_counter() - t0:.1f}s")
+        # the vectors go last: a chunk only counts as done once both files exist
+        save_array_checkpoint(rows_path, np.array(row_docs, dtype=np.int64))
+        save_array_checkpoint(chunk_path, chunk_vectors)
+        logger.info(f"  Total elapsed: {time.perf_counter() - build_start:.1f}s")
+
+    # Second pass: memory-map the checkpoints to read their shapes without
+    # loading them, then stream them into the final matrix.
+    offsets = range(0, total, CHECKPOINT_SIZE)
+    shapes = [np.load(PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.npy", mmap_mode="r").shape for i in offsets]
+    total_rows = sum(shape[0] for shape in shapes)
+    logger.info(f"Writing {total_rows:,} passage vectors for {total:,} documents")
+    matrix = np.lib.format.open_memmap(
+        f"{PASSAGE_INDEX_PATH}.npy", mode="w+", dtype=np.float16, shape=(total_rows, shapes[0][1]),
+    )
+    rows = np.lib.format.open_memmap(
+        f"{PASSAGE_INDEX_PATH}.rows.npy", mode="w+", dtype=np.int64, shape=(total_rows,),
+    )
+    start = 0
+    for i, shape in zip(offsets, shapes):
+        matrix[start:start + shape[0]] = normalize_float16(np.load(PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.npy"))
+        rows[start:start + shape[0]] = np.load(PASSAGE_CHECKPOINT_DIR / f"chunk_{i}.rows.npy")
+        start += shape[0]
+    matrix.flush()
+    rows.flush()
+    del matrix, rows
+
+    assemble_docs_json(PASSAGE_CHECKPOINT_DIR, total, PASSAGE_INDEX_PATH)
+
+    index = VectorIndex()
+    index.load(PASSAGE_INDEX_PATH)
+    return index
+
+
 if __name__ == "__main__":
-    model = get_embedding_model()
+    parser = argparse.ArgumentParser(description="Semantic search over Wikipedia")
+    parser.add_argument(
+        "--passages", action="store_true",
+        help="index overlapping passages of the full articles instead of just the abstracts",
+    )
+    parser.add_argument(
+        "--onnx", action="store_true",
+        help="encode queries with the int8-quantized ONNX model (needs sentence-transformers[onnx])",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None,
+        help="ONNX Runtime threads per query with --onnx (default: all cores); "
+        "find the best setting with benchmark_embeddings.py",
+    )
+    args = parser.parse_args()
+    index_path = PASSAGE_INDEX_PATH if args.passages else INDEX_PATH
 
     # try loading a saved index first
+    index = VectorIndex()
+    build_model = None
     try:
-        index = VectorIndex()
-        index.load(INDEX_PATH)
-        logger.info(f"Loaded vector index with {len(index.documents)} documents from disk")
+        index.load(index_path)
     except FileNotFoundError:
         logger.info("No saved index found, building from scratch...")
-        total, documents = load_documents()
-        index = build_vector_index(documents, total, model)
+        build_model = get_embedding_model()
+        if args.passages:
+            total, documents = load_documents(full_text=True)
+            index = build_passage_index(documents, total, build_model)
+        else:
+            total, documents = load_documents()
+            index = build_vector_index(documents, total, build_model)
+    else:
+        logger.info(f"Loaded vector index with {len(index.documents)} documents from disk")
 
     logger.info(f"Index contains {len(index.documents)} documents")
 
+    # page the index into memory in the background while the model loads;
+    # the index is always built with the reference model
+    index.warmup(background=True)
+    if args.onnx:
+        model = get_onnx_embedding_model(num_threads=args.threads)
+    else:
+        model = build_model or get_embedding_model()
+
+    warmup_model(model)
+    index.wait_ready()
+    logger.info("Ready for queries")
+
     queries = [
         "London Beer Flood",
         "alcoholic beverage disaster in England",
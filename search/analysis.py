@@ -10,6 +10,8 @@ STOPWORDS = set(['the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have',
                  'do', 'at', 'this', 'but', 'his', 'by', 'from', 'wikipedia'])
 PUNCTUATION = re.compile('[%s]' % re.escape(string.punctuation))
 STEMMER = Stemmer.Stemmer('english')
+# a whitespace token without the punctuation around it (quotes, commas, etc)
+WORD = re.compile(r'[^\s{0}](?:\S*[^\s{0}])?'.format(re.escape(string.punctuation)))
 
 def tokenize(text):
     return text.split()
@@ -34,3 +36,16 @@ def analyze(text):
     tokens = stem_filter(tokens)
 
     return [token for token in tokens if token]
+
+def analyze_with_offsets(text):
+    """
+    Same as analyze, but returns (token, start, end) tuples with the character
+    offsets of every token in the original text, so hits can be highlighted
+    later on without analyzing the text again.
+    """
+    matches = list(WORD.finditer(text))
+    tokens = punctuation_filter(lowercase_filter([match.group() for match in matches]))
+    kept = [(token, match) for token, match in zip(tokens, matches) if token not in STOPWORDS]
+    stems = stem_filter([token for token, _ in kept])
+
+    return [(stem, *match.span()) for stem, (_, match) in zip(stems, kept) if stem]
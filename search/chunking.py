@@ -0,0 +1,35 @@
+from .documents import Abstract
+
+# all-MiniLM-L6-v2 truncates its input at 256 word pieces; 128 whitespace
+# tokens leaves plenty of room for the title and longer words.
+WINDOW_SIZE = 128
+WINDOW_OVERLAP = 32
+
+
+def chunk_text(text: str, window: int = WINDOW_SIZE, overlap: int = WINDOW_OVERLAP) -> list[str]:
+    """Split text into overlapping windows of whitespace tokens.
+
+    Consecutive windows share ``overlap`` tokens, so a passage that straddles a
+    window boundary still ends up whole in at least one of them.
+    """
+    if overlap >= window:
+        raise ValueError(f"overlap ({overlap}) must be smaller than window ({window})")
+    tokens = text.split()
+    if not tokens:
+        return []
+    stride = window - overlap
+    # the last window starts early enough to reach the end, but not any later
+    starts = range(0, max(len(tokens) - overlap, 1), stride)
+    return [' '.join(tokens[start:start + window]) for start in starts]
+
+
+def chunk_document(document: Abstract, window: int = WINDOW_SIZE, overlap: int = WINDOW_OVERLAP) -> list[str]:
+    """Split a document's full article text into passages to embed.
+
+    Every passage is prefixed with the title so it still makes sense on its
+    own. Documents without article text fall back to the abstract.
+    """
+    chunks = chunk_text(document.text or document.abstract, window, overlap)
+    if not chunks:
+        return [document.title]
+    return [' '.join([document.title, chunk]) for chunk in chunks]
@@ -1,7 +1,8 @@
+from array import array
 from collections import Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from .analysis import analyze
+from .analysis import analyze_with_offsets
 
 
 @dataclass
@@ -11,13 +12,20 @@ class Abstract:
     title: str
     abstract: str
     url: str
+    # full article body, only kept around while building a passage index
+    text: str = field(default='', repr=False)
 
     @property
     def fulltext(self):
         return ' '.join([self.title, self.abstract])
 
     def analyze(self):
-        self.term_frequencies = Counter(analyze(self.fulltext))
+        analyzed = analyze_with_offsets(self.fulltext)
+        # the analyzed tokens in order, and the (start, end) character offsets
+        # of every token in fulltext, flattened; used for highlighting
+        self.tokens = [token for token, _, _ in analyzed]
+        self.token_offsets = array('I', [offset for _, start, end in analyzed for offset in (start, end)])
+        self.term_frequencies = Counter(self.tokens)
 
     def term_frequency(self, term):
         return self.term_frequencies.get(term, 0)
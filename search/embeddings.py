@@ -1,14 +1,71 @@
+import platform
+from pathlib import Path
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 DEFAULT_MODEL = "all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = Path("data/onnx")
 
 
 def get_embedding_model(model_name=DEFAULT_MODEL):
     """Load a sentence-transformers model."""
+    # Imported here rather than at the top: sentence-transformers pulls in torch,
+    # which takes seconds to import, and not every caller needs a model.
+    from sentence_transformers import SentenceTransformer
+
     return SentenceTransformer(model_name)
 
 
+def default_quantization_config():
+    """Pick the ONNX Runtime int8 quantization preset for this CPU."""
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+
+def get_onnx_embedding_model(
+    model_name=DEFAULT_MODEL, quantize=True, num_threads=None, model_dir=ONNX_MODEL_DIR
+):
+    """Load a sentence-transformers model on the ONNX Runtime backend.
+
+    The model is exported to ONNX on first use and, with quantize=True,
+    dynamically quantized to int8 weights. Both are saved in model_dir and
+    reused after that. num_threads sets the number of threads ONNX Runtime
+    uses per query; by default it uses all cores. This needs the ONNX
+    extra of sentence-transformers (`uv pip install "sentence-transformers[onnx]"`).
+    """
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    session_options = onnxruntime.SessionOptions()
+    if num_threads is not None:
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+    export_dir = Path(model_dir) / Path(model_name).name
+    # depending on the version, sentence-transformers saves the ONNX model in the
+    # root of the directory or in onnx/
+    if not any(export_dir.glob("**/model.onnx")):
+        SentenceTransformer(model_name, backend="onnx").save(str(export_dir))
+    if quantize:
+        file_name = "model_qint8.onnx"
+        if not (export_dir / "onnx" / file_name).exists():
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(str(export_dir), backend="onnx"),
+                default_quantization_config(),
+                str(export_dir),
+                file_suffix="qint8",
+            )
+        model_kwargs["file_name"] = f"onnx/{file_name}"
+
+    return SentenceTransformer(str(export_dir), backend="onnx", model_kwargs=model_kwargs)
+
+
+def warmup_model(model):
+    """Run a dummy encode, so the first real query doesn't pay for lazy initialization."""
+    embed_text(model, "warmup")
+
+
 def embed_text(model, text):
     """Embed a single text string. Returns a float32 numpy array."""
     return model.encode(text, convert_to_numpy=True).astype(np.float32)
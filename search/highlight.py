@@ -0,0 +1,62 @@
+SNIPPET_SIZE = 20
+PRE_TAG = '**'
+POST_TAG = '**'
+ELLIPSIS = '…'
+
+
+def _best_window(matches, size):
+    """
+    Slide a window of `size` tokens over the matching positions, and return
+    the first position of the window containing the most distinct query
+    terms (ties are broken by the total number of hits).
+    """
+    best, best_score = matches[0][0], (0, 0)
+    right = 0
+    for left, (start, _) in enumerate(matches):
+        while right < len(matches) and matches[right][0] < start + size:
+            right += 1
+        window = matches[left:right]
+        score = (len({term for _, term in window}), len(window))
+        if score > best_score:
+            best, best_score = start, score
+    return best
+
+
+def highlight(document, analyzed_query, size=SNIPPET_SIZE, pre=PRE_TAG, post=POST_TAG):
+    """
+    Build a snippet of a document: the window of `size` (analyzed) tokens that
+    matches the most query terms, with every matching term wrapped in the pre
+    and post tags. This relies on the token offsets stored when the document
+    was analyzed, so only documents that weren't indexed get analyzed here.
+    """
+    if not hasattr(document, 'token_offsets'):
+        document.analyze()
+    text = document.fulltext
+    offsets = document.token_offsets
+    num_tokens = len(offsets) // 2
+    if not num_tokens:
+        return text
+
+    query_terms = set(analyzed_query)
+    matches = [(position, term) for position, term in enumerate(document.tokens) if term in query_terms]
+    first = 0
+    if matches:
+        # center the matches in the window, as far as the text allows
+        first = _best_window(matches, size)
+        last_match = max(position for position, _ in matches if position < first + size)
+        first = max(0, min(first - (size - (last_match - first + 1)) // 2, num_tokens - size))
+    last = min(first + size, num_tokens) - 1
+
+    # don't cut off leading or trailing stopwords and punctuation of the text
+    start = offsets[2 * first] if first > 0 else 0
+    end = offsets[2 * last + 1] if last < num_tokens - 1 else len(text)
+    parts = [ELLIPSIS] if first > 0 else []
+    for position, _ in matches:
+        if first <= position <= last:
+            token_start, token_end = offsets[2 * position], offsets[2 * position + 1]
+            parts.extend([text[start:token_start], pre, text[token_start:token_end], post])
+            start = token_end
+    parts.append(text[start:end])
+    if last < num_tokens - 1:
+        parts.append(ELLIPSIS)
+    return ''.join(parts)
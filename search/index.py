@@ -1,6 +1,8 @@
 import math
 
 from .analysis import analyze
+from .highlight import highlight
+from .term_matrix import TermMatrix
 from .timing import timing
 
 
@@ -8,13 +10,16 @@ class Index:
     def __init__(self):
         self.index = {}
         self.documents = {}
+        self._matrix = None
 
     def index_document(self, document):
         if document.ID not in self.documents:
             self.documents[document.ID] = document
             document.analyze()
+            # a compiled matrix no longer covers every document
+            self._matrix = None
 
-        for token in analyze(document.fulltext):
+        for token in self.documents[document.ID].term_frequencies:
             if token not in self.index:
                 self.index[token] = set()
             self.index[token].add(document.ID)
@@ -28,11 +33,27 @@ class Index:
         # https://nlp.stanford.edu/IR-book/html/htmledition/inverse-document-frequency-1.html
         return math.log10(len(self.documents) / self.document_frequency(token))
 
+    def compile(self):
+        """
+        Compile the index into a sparse document-term matrix of TF weights
+        plus a vector of IDF weights. Once compiled, ranked searches are scored
+        with vectorized numpy operations instead of a Python loop per document.
+        Indexing another document drops the compiled matrix again.
+        """
+        self._matrix = TermMatrix(self.documents)
+        return self._matrix
+
+    def term_matrix(self):
+        """The compiled document-term matrix, compiling the index if needed."""
+        if self._matrix is None:
+            self.compile()
+        return self._matrix
+
     def _results(self, analyzed_query):
         return [self.index.get(token, set()) for token in analyzed_query]
 
     @timing
-    def search(self, query, search_type='AND', rank=False):
+    def search(self, query, search_type='AND', rank=False, k=None, snippets=False):
         """
         Search; this will return documents that contain words from the query,
         and rank them if requested (sets are fast, but unordered).
@@ -40,12 +61,27 @@ class Index:
         Parameters:
           - query: the query string
           - search_type: ('AND', 'OR') do all query terms have to match, or just one
-          - score: (True, False) if True, rank results based on TF-IDF score
+          - rank: (True, False) if True, rank results based on TF-IDF score
+          - k: only return k results, the k best ones if ranked (all of them if None)
+          - snippets: (True, False) if True, add a highlighted snippet to every
+            result, i.e. return (document, snippet) or (document, score, snippet)
         """
         if search_type not in ('AND', 'OR'):
             return []
 
         analyzed_query = analyze(query)
+        results = self._search(analyzed_query, search_type, rank, k)
+        if not snippets:
+            return results
+        # only highlight the page of results we return
+        if rank:
+            return [(document, score, highlight(document, analyzed_query)) for document, score in results]
+        return [(document, highlight(document, analyzed_query)) for document in results]
+
+    def _search(self, analyzed_query, search_type, rank, k):
+        if rank and self._matrix is not None:
+            return self._matrix.rank(analyzed_query, search_type, k)
+
         results = self._results(analyzed_query)
         if search_type == 'AND':
             # all tokens must be in the document
@@ -55,8 +91,8 @@ class Index:
             documents = [self.documents[doc_id] for doc_id in set.union(*results)]
 
         if rank:
-            return self.rank(analyzed_query, documents)
-        return documents
+            documents = self.rank(analyzed_query, documents)
+        return documents[:k if k is None else max(k, 0)]
 
     def rank(self, analyzed_query, documents):
         results = []
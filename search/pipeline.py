@@ -0,0 +1,161 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Protocol
+
+import numpy as np
+import numpy.typing as npt
+
+from .analysis import analyze
+from .documents import Abstract
+from .index import Index
+from .timing import timing
+from .vector_index import VectorIndex
+
+# Rows quantized or scanned at a time by the QuantizedVectorRetriever, which
+# bounds the float32 temporaries to QUANTIZE_CHUNK_ROWS x dimensions.
+QUANTIZE_CHUNK_ROWS = 65_536
+
+
+@dataclass
+class Query:
+    """A query as every stage needs it: the text, and optionally its embedding."""
+    text: str
+    vector: npt.NDArray[np.float32] | None = field(default=None, repr=False)
+
+    @cached_property
+    def terms(self) -> list[str]:
+        return analyze(self.text)
+
+    def require_vector(self) -> npt.NDArray[np.float32]:
+        if self.vector is None:
+            raise ValueError("This stage needs a query vector, e.g. Query(text, embed_text(model, text))")
+        return self.vector
+
+
+class Retriever(Protocol):
+    def retrieve(self, query: Query, n: int) -> list[Abstract]: ...
+
+
+class Scorer(Protocol):
+    def score(self, query: Query, documents: Sequence[Abstract]) -> npt.NDArray[np.float64]: ...
+
+
+class LexicalRetriever:
+    """First stage: the best TF-IDF matches from a (compiled) full-text index."""
+
+    def __init__(self, index: Index, search_type: str = "OR"):
+        self.index = index
+        self.search_type = search_type
+        index.term_matrix()
+
+    def retrieve(self, query: Query, n: int) -> list[Abstract]:
+        matrix = self.index.term_matrix()
+        return [document for document, _ in matrix.rank(query.terms, self.search_type, n)]
+
+
+class QuantizedVectorRetriever:
+    """First stage: approximate nearest neighbours on an int8 copy of the matrix.
+
+    The rows of the matrix are unit vectors, so every component is in [-1, 1]
+    and scaling by 127 fits them in an int8 with a single global scale. The
+    copy is a quarter of the size of a float32 matrix (half of float16), which
+    makes it cheap to keep in memory, at the cost of some precision.
+    """
+
+    def __init__(self, vector_index: VectorIndex):
+        self.vector_index = vector_index
+        matrix = vector_index.matrix
+        self.matrix = np.empty(matrix.shape, dtype=np.int8)
+        # quantize a chunk at a time, so we never hold a float32 copy of a memmap
+        for start in range(0, len(matrix), QUANTIZE_CHUNK_ROWS):
+            chunk = np.asarray(matrix[start:start + QUANTIZE_CHUNK_ROWS], dtype=np.float32)
+            self.matrix[start:start + QUANTIZE_CHUNK_ROWS] = np.rint(chunk * 127)
+
+    def retrieve(self, query: Query, n: int) -> list[Abstract]:
+        vector = query.require_vector()
+        query_vector = vector / (np.linalg.norm(vector) or 1)
+        scores = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), QUANTIZE_CHUNK_ROWS):
+            chunk = self.matrix[start:start + QUANTIZE_CHUNK_ROWS]
+            scores[start:start + QUANTIZE_CHUNK_ROWS] = chunk.astype(np.float32) @ query_vector
+        return [document for document, _ in self.vector_index.top_documents(scores, n)]
+
+
+class CosineScorer:
+    """Exact float32 cosine similarity, gathered from the vector index's matrix."""
+
+    def __init__(self, vector_index: VectorIndex):
+        self.vector_index = vector_index
+
+    def score(self, query: Query, documents: Sequence[Abstract]) -> npt.NDArray[np.float64]:
+        scores = self.vector_index.rescore(query.require_vector(), [doc.ID for doc in documents])
+        return scores.astype(np.float64)
+
+
+class BM25Scorer:
+    """BM25 scores from a full-text index's compiled document-term matrix."""
+
+    def __init__(self, index: Index, k1: float = 1.2, b: float = 0.75):
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        index.term_matrix()
+
+    def score(self, query: Query, documents: Sequence[Abstract]) -> npt.NDArray[np.float64]:
+        matrix = self.index.term_matrix()
+        return matrix.bm25(query.terms, [doc.ID for doc in documents], self.k1, self.b)
+
+
+class LinearScorer:
+    """Weighted sum of the scores of other scorers, e.g. [(0.8, cosine), (0.05, bm25)]."""
+
+    def __init__(self, weighted_scorers: Sequence[tuple[float, Scorer]]):
+        self.weighted_scorers = weighted_scorers
+
+    def score(self, query: Query, documents: Sequence[Abstract]) -> npt.NDArray[np.float64]:
+        scores = np.zeros(len(documents))
+        for weight, scorer in self.weighted_scorers:
+            scores += weight * scorer.score(query, documents)
+        return scores
+
+
+class Pipeline:
+    """
+    Two-stage retrieval: a cheap first stage (a retriever) pulls a few hundred
+    candidates out of the whole collection, and a more expensive second stage
+    (a scorer) re-scores only those candidates to produce the final top k.
+
+    pipeline = Pipeline(QuantizedVectorRetriever(vector_index), CosineScorer(vector_index))
+    pipeline.search(Query("London Beer Flood", embed_text(model, "London Beer Flood")))
+    first_stage took 2.1 milliseconds
+    second_stage took 0.4 milliseconds
+    search took 2.6 milliseconds
+    """
+
+    def __init__(self, retriever: Retriever, scorer: Scorer, num_candidates: int = 200):
+        self.retriever = retriever
+        self.scorer = scorer
+        self.num_candidates = num_candidates
+
+    @timing
+    def first_stage(self, query: Query) -> list[Abstract]:
+        return self.retriever.retrieve(query, self.num_candidates)
+
+    @timing
+    def second_stage(self, query: Query, candidates: list[Abstract]) -> npt.NDArray[np.float64]:
+        return self.scorer.score(query, candidates)
+
+    @timing
+    def search(self, query: Query, k: int = 10) -> list[tuple[Abstract, float]]:
+        """Find the k best documents for the query, as (document, score) tuples."""
+        if k <= 0:
+            return []
+        candidates = self.first_stage(query)
+        if not candidates:
+            return []
+        scores = self.second_stage(query, candidates)
+        k = min(k, len(candidates))
+        top_k = np.argpartition(scores, -k)[-k:]
+        top_k = top_k[np.argsort(scores[top_k])[::-1]]
+        return [(candidates[i], float(scores[i])) for i in top_k]
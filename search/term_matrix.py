@@ -0,0 +1,129 @@
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+from functools import cached_property
+
+import numpy as np
+import numpy.typing as npt
+
+from .documents import Abstract
+
+
+class TermMatrix:
+    """Sparse document-term matrix of TF weights, stored column-wise (CSC).
+
+    Column j holds the postings of term j: the rows (documents) that contain
+    it are ``indices[indptr[j]:indptr[j + 1]]`` and their term frequencies are
+    the matching slice of ``data``. Ranking a query only touches the columns
+    of its terms, so the cost is proportional to the number of postings read
+    rather than the size of the collection.
+    """
+
+    def __init__(self, documents: Mapping[int, Abstract]):
+        self.doc_ids = np.array(list(documents.keys()), dtype=np.int64)
+        self.documents = documents
+
+        self.vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        tfs: list[int] = []
+        for row, document in enumerate(documents.values()):
+            for term, tf in document.term_frequencies.items():
+                col = self.vocabulary.setdefault(term, len(self.vocabulary))
+                rows.append(row)
+                cols.append(col)
+                tfs.append(tf)
+
+        # Sort the (row, col, tf) triplets by column to get CSC layout; a stable
+        # sort keeps the rows within each column in ascending order.
+        col_array = np.array(cols, dtype=np.int64)
+        order = np.argsort(col_array, kind="stable")
+        self.indices = np.array(rows, dtype=np.int64)[order]
+        self.data = np.array(tfs, dtype=np.float32)[order]
+        document_frequencies = np.bincount(col_array, minlength=len(self.vocabulary))
+        self.indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequencies, out=self.indptr[1:])
+
+        # Same log10 IDF as Index.inverse_document_frequency, precomputed per term.
+        self.idf = np.log10(len(self.doc_ids) / np.maximum(document_frequencies, 1))
+
+        # For BM25: the (non-negative) Lucene variant of IDF, and the length of
+        # every document in analyzed tokens and their average.
+        self.bm25_idf = np.log1p(
+            (len(self.doc_ids) - document_frequencies + 0.5) / (document_frequencies + 0.5)
+        )
+        self.doc_lengths = np.bincount(self.indices, weights=self.data, minlength=len(self.doc_ids))
+        self.average_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+    @cached_property
+    def rows_by_id(self) -> dict[int, int]:
+        """Row of every document ID; only BM25 rescoring needs it, so it's built on first use."""
+        return {int(doc_id): row for row, doc_id in enumerate(self.doc_ids)}
+
+    def rank(
+        self, analyzed_query: Sequence[str], search_type: str = "AND", k: int | None = None
+    ) -> list[tuple[Abstract, float]]:
+        """Score documents matching the query by TF-IDF and return the top k."""
+        if k is not None and k <= 0:
+            return []
+        # Repeated query terms count once per occurrence, like Index.rank.
+        query_terms = Counter(analyzed_query)
+        columns = [self.vocabulary[term] for term in query_terms if term in self.vocabulary]
+        if not columns or (search_type == "AND" and len(columns) < len(query_terms)):
+            return []
+
+        # Slice the query term columns out of the matrix, and weight each
+        # posting by its term's IDF (times the number of times it's in the query).
+        weights = np.array([query_terms[term] for term in query_terms if term in self.vocabulary])
+        weights = weights * self.idf[columns]
+        starts, ends = self.indptr[columns], self.indptr[np.array(columns) + 1]
+        rows = np.concatenate([self.indices[s:e] for s, e in zip(starts, ends)])
+        values = np.concatenate([self.data[s:e] for s, e in zip(starts, ends)])
+        values = values * np.repeat(weights, ends - starts)
+
+        # Sum the weighted postings per document; np.unique keeps this
+        # proportional to the number of postings instead of the number of docs.
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=values)
+        if search_type == "AND":
+            matched = np.bincount(inverse) == len(columns)
+            candidates, scores = candidates[matched], scores[matched]
+
+        if k is None or k >= len(candidates):
+            top_k = np.argsort(scores, kind="stable")[::-1]
+        else:
+            # argpartition is O(n) vs O(n log n) for a full sort — we only need the top k.
+            top_k = np.argpartition(scores, -k)[-k:]
+            top_k = top_k[np.argsort(scores[top_k])[::-1]]
+        return [
+            (self.documents[int(self.doc_ids[candidates[i]])], float(scores[i]))
+            for i in top_k
+        ]
+
+    def bm25(
+        self, analyzed_query: Sequence[str], ids: Iterable[int], k1: float = 1.2, b: float = 0.75
+    ) -> npt.NDArray[np.float64]:
+        """BM25 scores of the documents with the given IDs (0 for unknown IDs).
+
+        Each query term is a binary search of the candidates in that term's
+        (sorted) column, so the cost depends on the number of candidates,
+        not on the number of documents containing the term.
+        """
+        rows = np.array([self.rows_by_id.get(doc_id, -1) for doc_id in ids], dtype=np.int64)
+        scores = np.zeros(len(rows))
+        known = rows >= 0
+        lengths = self.doc_lengths[rows[known]]
+        if self.average_length:
+            norms = k1 * (1 - b + b * lengths / self.average_length)
+        else:
+            norms = np.full(len(lengths), k1)
+
+        for term, count in Counter(analyzed_query).items():
+            col = self.vocabulary.get(term)
+            if col is None:
+                continue
+            start, end = self.indptr[col], self.indptr[col + 1]
+            postings = self.indices[start:end]
+            positions = np.minimum(np.searchsorted(postings, rows[known]), len(postings) - 1)
+            tfs = np.where(postings[positions] == rows[known], self.data[start:end][positions], 0.0)
+            scores[known] += count * self.bm25_idf[col] * tfs * (k1 + 1) / (tfs + norms)
+        return scores
@@ -1,5 +1,8 @@
+import contextlib
 import json
-from collections.abc import Iterable
+import mmap
+import threading
+from collections.abc import Callable, Iterable
 from pathlib import Path
 
 import numpy as np
@@ -8,46 +11,292 @@ import numpy.typing as npt
 from .documents import Abstract
 from .timing import timing
 
+# Filters that keep less than this fraction of the rows gather just those rows
+# from the matrix; broader filters scan the whole matrix and mask the scores.
+GATHER_SELECTIVITY = 0.05
+# Rows read at a time when prefaulting the matrix during warmup
+WARMUP_CHUNK_ROWS = 65_536
+
 
 class VectorIndex:
     def __init__(self, dimensions: int = 384):
         self.dimensions = dimensions
         self.documents: dict[int, Abstract] = {}
         self._matrix: npt.NDArray[np.float32] | None = None
+        # For passage indexes with many vectors per document, the document
+        # number of every row in the matrix; None means one row per document.
+        self._row_docs: npt.NDArray[np.int64] | None = None
+        self._docs_by_id: dict[int, int] | None = None
+        # Set once the matrix is resident in memory: straight away for built
+        # indexes, after warmup() for memory-mapped ones.
+        self.ready = threading.Event()
+        self._warmup_error: BaseException | None = None
 
     def build(
-        self, documents: Iterable[Abstract], vectors: npt.NDArray[np.float32]
+        self,
+        documents: Iterable[Abstract],
+        vectors: npt.NDArray[np.float32],
+        row_docs: npt.NDArray[np.int64] | None = None,
     ) -> None:
-        """Store documents and their pre-computed embedding vectors."""
+        """Store documents and their pre-computed embedding vectors.
+
+        By default row i of ``vectors`` embeds the i-th document. For passage
+        (multi-vector) indexes, ``row_docs[i]`` is the position of the document
+        that row i belongs to; the rows of a document have to be consecutive,
+        in document order.
+        """
+        if row_docs is not None and np.any(np.diff(row_docs) < 0):
+            raise ValueError("row_docs must be sorted: store the rows of every document together, in order")
         for i, doc in enumerate(documents):
             self.documents[i] = doc
+        self._docs_by_id = None
+        self._row_docs = None if row_docs is None else np.array(row_docs, dtype=np.int64)
 
         self._matrix = np.array(vectors, dtype=np.float32)
         # normalize all vectors to unit length so dot product = cosine similarity
         norms = np.linalg.norm(self._matrix, axis=1, keepdims=True)
         norms[norms == 0] = 1  # avoid division by zero
         self._matrix /= norms
+        self._warmup_error = None
+        self.ready.set()
 
-    @timing
-    def search(
-        self, query_vector: npt.NDArray[np.float32], k: int = 10
-    ) -> list[tuple[Abstract, float]]:
-        """Find the k documents most similar to the query vector."""
+    @property
+    def matrix(self) -> npt.NDArray[np.float32]:
+        """The normalized embedding matrix; memory-mapped, and float16, when loaded from disk."""
+        if self._matrix is None:
+            raise ValueError("Index not built. Call build() first.")
+        return self._matrix
+
+    def warmup(self, background: bool = False) -> threading.Event:
+        """Page the memory-mapped matrix into memory ahead of the first search.
+
+        A freshly loaded index is read from disk on demand, so the first
+        searches are slow while the OS faults in every page of the matrix.
+        This asks the kernel to read ahead (madvise, where available) and
+        then touches every row. With background=True it runs in a daemon
+        thread; call wait_ready() to know when it's done.
+        """
         if self._matrix is None:
             raise ValueError("Index not built. Call build() first.")
+        if background:
+            threading.Thread(target=self._warmup, name="vector-index-warmup", daemon=True).start()
+        else:
+            self._warmup()
+        return self.ready
+
+    def _warmup(self) -> None:
+        self._warmup_error = None
+        try:
+            for array in (self._matrix, self._row_docs):
+                if array is None:
+                    continue
+                buffer = getattr(array, "_mmap", None)
+                if buffer is not None and hasattr(mmap, "MADV_WILLNEED"):
+                    # only a hint; touching the rows below works without it
+                    with contextlib.suppress(OSError):
+                        buffer.madvise(mmap.MADV_WILLNEED)
+                # Reading a chunk faults its pages in; numpy releases the GIL while
+                # it does, so a background warmup doesn't hold up other threads.
+                for start in range(0, len(array), WARMUP_CHUNK_ROWS):
+                    np.max(array[start:start + WARMUP_CHUNK_ROWS])
+        except BaseException as error:
+            # hand the error to whoever waits for the index to be ready
+            self._warmup_error = error
+            raise
+        finally:
+            self.ready.set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait for warmup() to finish; re-raises the error if it failed.
+
+        Returns False if the index isn't ready within the timeout.
+        """
+        if not self.ready.wait(timeout):
+            return False
+        if self._warmup_error is not None:
+            raise self._warmup_error
+        return True
+
+    def mask(self, predicate: Callable[[Abstract], bool]) -> npt.NDArray[np.bool_]:
+        """Build a boolean mask of the documents matching a predicate.
+
+        e.g. ``index.mask(lambda doc: doc.title.startswith("London"))``
+        """
+        return np.fromiter(
+            (predicate(self.documents[i]) for i in range(len(self.documents))),
+            dtype=bool, count=len(self.documents),
+        )
+
+    def _doc_numbers(self, ids: Iterable[int]) -> npt.NDArray[np.intp]:
+        """Positions of the documents with the given IDs (-1 for unknown IDs)."""
+        if self._docs_by_id is None:
+            self._docs_by_id = {doc.ID: i for i, doc in self.documents.items()}
+        return np.array([self._docs_by_id.get(doc_id, -1) for doc_id in ids], dtype=np.intp)
+
+    def _passage_rows(
+        self, doc_numbers: npt.NDArray[np.intp]
+    ) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """The rows of the given documents in a passage index, and the number of rows per document.
+
+        The rows of every document are consecutive and in document order, so
+        each document's run of rows is found with a binary search.
+        """
+        assert self._row_docs is not None
+        starts = np.searchsorted(self._row_docs, doc_numbers, side="left")
+        lengths = np.searchsorted(self._row_docs, doc_numbers, side="right") - starts
+        offsets = np.cumsum(lengths) - lengths
+        rows = np.arange(lengths.sum(), dtype=np.intp) + np.repeat(starts - offsets, lengths)
+        return rows, lengths
+
+    def _filter_rows(
+        self, filter: npt.NDArray[np.bool_] | Iterable[int]
+    ) -> npt.NDArray[np.intp]:
+        """Turn a boolean document mask or an allowlist of document IDs into matrix rows."""
+        # a mask can come in as a plain list of bools too; route on the dtype
+        if not isinstance(filter, np.ndarray):
+            filter = np.asarray(list(filter))
+        if filter.dtype == np.bool_:
+            if filter.shape != (len(self.documents),):
+                raise ValueError(
+                    f"Filter mask has shape {filter.shape}, expected ({len(self.documents)},)"
+                )
+            if self._row_docs is not None:
+                return np.flatnonzero(filter[self._row_docs])
+            return np.flatnonzero(filter)
+
+        doc_numbers = self._doc_numbers(filter.tolist())
+        doc_array = np.unique(doc_numbers[doc_numbers >= 0])
+        if self._row_docs is not None:
+            return self._passage_rows(doc_array)[0]
+        return doc_array
+
+    def _top_k_docs(
+        self, scores: npt.NDArray[np.float32], score_docs: npt.NDArray[np.int64], k: int
+    ) -> npt.NDArray[np.intp]:
+        """Positions in scores of the best scoring row of each of the top k documents.
+
+        Several rows can belong to the same document, so we take the top rows,
+        keep the first (i.e. best) row of every document and widen the window
+        until it holds k distinct documents or every row.
+        """
+        n = min(4 * k, len(scores))
+        while True:
+            top = np.argpartition(scores, -n)[-n:]
+            top = top[np.argsort(scores[top], kind="stable")[::-1]]
+            _, first = np.unique(score_docs[top], return_index=True)
+            if len(first) >= k or n == len(scores):
+                return top[np.sort(first)[:k]]
+            n = min(4 * n, len(scores))
+
+    @staticmethod
+    def _normalize(query_vector: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
         # Keep the query in float32 for precision — numpy will upcast the matrix
         # (which may be float16) automatically during matmul.
         query = np.array(query_vector, dtype=np.float32)
         norm = np.linalg.norm(query)
         if norm > 0:
             query = query / norm
+        return query
+
+    def rescore(
+        self, query_vector: npt.NDArray[np.float32], ids: Iterable[int]
+    ) -> npt.NDArray[np.float32]:
+        """Exact cosine similarity between the query and the documents with the given IDs.
+
+        Only the rows of those documents are gathered from the matrix and
+        upcast to float32, so re-scoring a few hundred candidates doesn't touch
+        the rest of the matrix. In a passage index a document scores as its
+        best passage. Documents that aren't in the index score 0.
+        """
+        if self._matrix is None:
+            raise ValueError("Index not built. Call build() first.")
+        query = self._normalize(query_vector)
+        doc_numbers = self._doc_numbers(ids)
+        known = np.flatnonzero(doc_numbers >= 0)
+        scores = np.zeros(len(doc_numbers), dtype=np.float32)
+        if not len(known):
+            return scores
+
+        if self._row_docs is None:
+            rows = doc_numbers[known]
+            scores[known] = self._matrix[rows].astype(np.float32) @ query
+            return scores
+
+        rows, lengths = self._passage_rows(doc_numbers[known])
+        known, lengths = known[lengths > 0], lengths[lengths > 0]
+        if not len(known):
+            return scores
+        row_scores = self._matrix[rows].astype(np.float32) @ query
+        # best passage per document: reduce over each document's run of rows
+        scores[known] = np.maximum.reduceat(row_scores, np.cumsum(lengths) - lengths)
+        return scores
+
+    @timing
+    def search(
+        self,
+        query_vector: npt.NDArray[np.float32],
+        k: int = 10,
+        filter: npt.NDArray[np.bool_] | Iterable[int] | None = None,
+    ) -> list[tuple[Abstract, float]]:
+        """Find the k documents most similar to the query vector.
+
+        ``filter`` restricts the results to a subset of the documents, either as
+        a boolean mask over the documents (see ``mask()``) or as an allowlist of
+        document IDs. Selective filters only read the matching rows from the
+        matrix; broad ones scan the whole matrix and mask out the rest.
+
+        In a passage index a document scores as its best matching passage
+        (max-sim), and every document is returned at most once.
+        """
+        if self._matrix is None:
+            raise ValueError("Index not built. Call build() first.")
+        query = self._normalize(query_vector)
+
+        if filter is None:
+            # Cosine similarity via dot product — works because all vectors are unit-normalized.
+            rows = None
+            scores = self._matrix @ query
+        else:
+            rows = self._filter_rows(filter)
+            if len(rows) < GATHER_SELECTIVITY * len(self._matrix):
+                # Fancy indexing a memmap only pages in the rows we ask for.
+                scores = self._matrix[rows] @ query
+            else:
+                scores = (self._matrix @ query)[rows]
+
+        return self._ranked(scores, rows, k)
+
+    def top_documents(
+        self, scores: npt.NDArray[np.float32], k: int = 10
+    ) -> list[tuple[Abstract, float]]:
+        """The k best documents, given a score for every row of the matrix.
+
+        For scoring the matrix some other way than search() does, e.g. with a
+        quantized copy of it. In a passage index a document scores as its
+        best row, and is returned once.
+        """
+        if len(scores) != len(self.matrix):
+            raise ValueError(f"Got {len(scores)} scores for a matrix of {len(self.matrix)} rows")
+        return self._ranked(scores, None, k)
+
+    def _ranked(
+        self, scores: npt.NDArray[np.float32], rows: npt.NDArray[np.intp] | None, k: int
+    ) -> list[tuple[Abstract, float]]:
+        """The top k (document, score) tuples, for scores of the given rows (all rows if None)."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        if self._row_docs is not None:
+            # passage index: map every score to its document and rank documents by their best row
+            score_docs = self._row_docs if rows is None else self._row_docs[rows]
+            top_k = self._top_k_docs(scores, score_docs, k)
+            return [(self.documents[int(score_docs[i])], float(scores[i])) for i in top_k]
 
-        # Cosine similarity via dot product — works because all vectors are unit-normalized.
-        scores = self._matrix @ query
-        k = min(k, len(self.documents))
         # argpartition is O(n) vs O(n log n) for a full sort — we only need the top k.
         top_k = np.argpartition(scores, -k)[-k:]
         top_k = top_k[np.argsort(scores[top_k])[::-1]]
+        if rows is not None:
+            return [(self.documents[int(rows[i])], float(scores[i])) for i in top_k]
         return [(self.documents[int(i)], float(scores[i])) for i in top_k]
 
     def save(self, path: str | Path) -> None:
@@ -56,11 +305,19 @@ class VectorIndex:
         Creates two files:
             - {path}.npy: the normalized embedding matrix
             - {path}.json: document metadata
+
+        plus {path}.rows.npy with the document number of every row for
+        passage indexes.
         """
         if self._matrix is None:
             raise ValueError("Index not built. Call build() first.")
         path = Path(path)
         np.save(f"{path}.npy", self._matrix)
+        if self._row_docs is not None:
+            np.save(f"{path}.rows.npy", self._row_docs)
+        else:
+            # don't leave the row map of an earlier passage index at this path behind
+            Path(f"{path}.rows.npy").unlink(missing_ok=True)
 
         docs_data = {
             str(i): {
@@ -80,10 +337,18 @@ class VectorIndex:
         The embedding matrix is memory-mapped (mmap_mode="r"), so it doesn't
         need to fit in RAM. The OS will page in data from disk as needed
         during search. This works transparently regardless of the matrix dtype
-        (float16 or float32).
+        (float16 or float32). Call warmup() to page it all in up front.
         """
         path = Path(path)
+        self.ready.clear()
+        self._warmup_error = None
         self._matrix = np.load(f"{path}.npy", mmap_mode="r")
+        rows_path = Path(f"{path}.rows.npy")
+        self._row_docs = np.load(rows_path, mmap_mode="r") if rows_path.exists() else None
+        if self._row_docs is not None and len(self._row_docs) != len(self._matrix):
+            raise ValueError(
+                f"{rows_path} maps {len(self._row_docs)} rows, but the matrix has {len(self._matrix)}"
+            )
 
         with open(f"{path}.json") as f:
             docs_data = json.load(f)
@@ -94,3 +359,4 @@ class VectorIndex:
             )
             for i, d in docs_data.items()
         }
+        self._docs_by_id = None
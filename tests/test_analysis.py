@@ -1,5 +1,6 @@
 from search.analysis import (
     analyze,
+    analyze_with_offsets,
     lowercase_filter,
     punctuation_filter,
     stem_filter,
@@ -50,3 +51,11 @@ def test_analyze_filters_empty_tokens():
     # Punctuation-only tokens should be filtered out
     result = analyze("... --- !!!")
     assert result == []
+
+
+def test_analyze_with_offsets():
+    text = "The quick (Brown) FOX, jumped!"
+    result = analyze_with_offsets(text)
+    assert [token for token, _, _ in result] == analyze(text)
+    # offsets point at the original tokens, without the surrounding punctuation
+    assert [text[start:end] for _, start, end in result] == ["quick", "Brown", "FOX", "jumped"]
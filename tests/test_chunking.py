@@ -0,0 +1,42 @@
+import pytest
+
+from search.chunking import chunk_document, chunk_text
+from search.documents import Abstract
+
+
+def test_chunk_text_overlapping_windows():
+    text = " ".join(str(i) for i in range(10))
+    assert chunk_text(text, window=4, overlap=1) == ["0 1 2 3", "3 4 5 6", "6 7 8 9"]
+
+
+def test_chunk_text_short_text_single_window():
+    assert chunk_text("a b c", window=4, overlap=1) == ["a b c"]
+
+
+def test_chunk_text_covers_every_token():
+    tokens = [str(i) for i in range(23)]
+    chunks = chunk_text(" ".join(tokens), window=5, overlap=2)
+    covered = {token for chunk in chunks for token in chunk.split()}
+    assert covered == set(tokens)
+    # no trailing window that only repeats the overlap
+    assert chunks[-1].split()[-1] == "22"
+    assert len(chunks[-1].split()) > 2
+
+
+def test_chunk_text_empty():
+    assert chunk_text("") == []
+
+
+def test_chunk_text_invalid_overlap():
+    with pytest.raises(ValueError):
+        chunk_text("a b c", window=2, overlap=2)
+
+
+def test_chunk_document_prefixes_title():
+    doc = Abstract(ID=1, title="Title", abstract="intro", url="", text="one two three four five")
+    assert chunk_document(doc, window=3, overlap=1) == ["Title one two three", "Title three four five"]
+
+
+def test_chunk_document_falls_back_to_abstract():
+    doc = Abstract(ID=1, title="Title", abstract="just the intro", url="")
+    assert chunk_document(doc) == ["Title just the intro"]
@@ -1,6 +1,29 @@
+import subprocess
+import sys
+
 import numpy as np
+import pytest
+
+from search.embeddings import (
+    embed_batch,
+    embed_text,
+    get_embedding_model,
+    get_onnx_embedding_model,
+    warmup_model,
+)
+
+TEXTS = [
+    "London Beer Flood",
+    "alcoholic beverage disaster in England",
+    "python programming language",
+    "large constricting reptiles",
+]
+
 
-from search.embeddings import embed_batch, embed_text, get_embedding_model
+def test_import_is_lazy():
+    # importing the module shouldn't pull in sentence-transformers (and torch)
+    code = "import sys, search.embeddings; assert 'sentence_transformers' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
 
 
 def test_get_embedding_model():
@@ -53,3 +76,32 @@ def test_embed_batch_consistent_with_single():
     batch = embed_batch(model, [text])
     assert batch.shape == (1, single.shape[0])
     np.testing.assert_allclose(single, batch[0], atol=1e-5)
+
+
+def test_warmup_model():
+    model = get_embedding_model()
+    warmup_model(model)
+
+
+def _cosine_similarities(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_onnx_model_matches_reference(tmp_path):
+    pytest.importorskip("optimum.onnxruntime")
+    reference = embed_batch(get_embedding_model(), TEXTS)
+    model = get_onnx_embedding_model(quantize=False, model_dir=tmp_path)
+    vectors = embed_batch(model, TEXTS)
+    assert vectors.shape == reference.shape
+    assert _cosine_similarities(vectors, reference).min() > 0.9999
+
+
+def test_quantized_onnx_model_matches_reference(tmp_path):
+    pytest.importorskip("optimum.onnxruntime")
+    reference = embed_batch(get_embedding_model(), TEXTS)
+    model = get_onnx_embedding_model(quantize=True, num_threads=1, model_dir=tmp_path)
+    vectors = embed_batch(model, TEXTS)
+    assert vectors.dtype == np.float32
+    assert _cosine_similarities(vectors, reference).min() > 0.98
+    # the quantized model is saved, so it's only exported once
+    assert (tmp_path / "all-MiniLM-L6-v2" / "onnx" / "model_qint8.onnx").exists()
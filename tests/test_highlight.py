@@ -0,0 +1,50 @@
+from search.analysis import analyze
+from search.documents import Abstract
+from search.highlight import highlight
+
+BEER_FLOOD = Abstract(
+    ID=1,
+    title="London Beer Flood",
+    abstract=(
+        "The London Beer Flood was an accident at Meux & Co's Horse Shoe Brewery, London, on "
+        "17 October 1814. It took place when one of the 22-foot-high wooden vats of fermenting "
+        "porter burst. The escaping beer knocked loose the valve of another vessel and destroyed "
+        "several large barrels: between 128,000 and 323,000 imperial gallons of beer were released."
+    ),
+    url="https://example.com/1",
+)
+
+
+def test_highlight_marks_matching_terms():
+    snippet = highlight(BEER_FLOOD, analyze("London beer"))
+    assert snippet.startswith("**London** **Beer** Flood")
+    # punctuation next to a term isn't highlighted
+    assert "**London**," in snippet
+
+
+def test_highlight_picks_best_window():
+    snippet = highlight(BEER_FLOOD, analyze("imperial gallons released"))
+    assert snippet.startswith("…")
+    assert "**imperial** **gallons**" in snippet
+    assert "**released**" in snippet
+    assert "Flood" not in snippet
+
+
+def test_highlight_window_size():
+    snippet = highlight(BEER_FLOOD, analyze("porter"), size=3)
+    assert snippet == "…fermenting **porter** burst…"
+
+
+def test_highlight_without_matches():
+    snippet = highlight(BEER_FLOOD, analyze("molasses"), size=3)
+    assert snippet == "London Beer Flood…"
+
+
+def test_highlight_custom_tags():
+    snippet = highlight(BEER_FLOOD, analyze("porter"), size=1, pre="<em>", post="</em>")
+    assert snippet == "…<em>porter</em>…"
+
+
+def test_highlight_analyzes_unindexed_documents():
+    doc = Abstract(ID=2, title="Python", abstract="Python is a language", url="")
+    assert highlight(doc, analyze("language")) == "Python Python is a **language**"
@@ -82,9 +82,82 @@ class TestIndex:
             assert isinstance(score, float)
             assert score > 0
 
+    def test_search_snippets(self):
+        index = _build_index()
+        results = index.search("Python programming", search_type="AND", snippets=True)
+        assert results == [(index.documents[1], "**Python** **programming** **Python** is a **programming** language")]
+
+    def test_search_snippets_only_for_k_results(self, monkeypatch):
+        index = _build_index()
+        highlighted = []
+        monkeypatch.setattr("search.index.highlight", lambda doc, query: highlighted.append(doc) or "")
+        results = index.search("Python programming", search_type="OR", k=2, snippets=True)
+        assert len(results) == 2
+        assert len(highlighted) == 2
+
+    def test_search_ranked_snippets(self):
+        index = _build_index()
+        results = index.search("snakes", search_type="OR", rank=True, snippets=True)
+        assert len(results) == 1
+        doc, score, snippet = results[0]
+        assert doc.ID == 3
+        assert score > 0
+        assert "**snakes**" in snippet
+
     def test_search_ranked_ordering(self):
         index = _build_index()
         results = index.search("Python programming", search_type="OR", rank=True)
         # Scores should be in descending order
         scores = [score for _, score in results]
         assert scores == sorted(scores, reverse=True)
+
+
+class TestCompiledIndex:
+    def test_compiled_matches_loop_ranking(self):
+        for search_type in ("AND", "OR"):
+            index = _build_index()
+            expected = index.search("Python programming", search_type=search_type, rank=True)
+            index.compile()
+            results = index.search("Python programming", search_type=search_type, rank=True)
+            assert {doc.ID for doc, _ in results} == {doc.ID for doc, _ in expected}
+            expected_scores = {doc.ID: score for doc, score in expected}
+            for doc, score in results:
+                assert abs(score - expected_scores[doc.ID]) < 1e-6
+
+    def test_compiled_and_requires_all_terms(self):
+        index = _build_index()
+        index.compile()
+        results = index.search("Python programming", search_type="AND", rank=True)
+        assert [doc.ID for doc, _ in results] == [1]
+        assert index.search("Python nonexistent", search_type="AND", rank=True) == []
+
+    def test_compiled_top_k(self):
+        index = _build_index()
+        index.compile()
+        results = index.search("Python programming", search_type="OR", rank=True, k=2)
+        assert len(results) == 2
+        scores = [score for _, score in results]
+        assert scores == sorted(scores, reverse=True)
+        all_scores = [score for _, score in index.search("Python programming", search_type="OR", rank=True)]
+        assert scores == all_scores[:2]
+
+    def test_compiled_k_zero(self):
+        index = _build_index()
+        assert index.search("Python programming", search_type="OR", rank=True, k=0) == []
+        index.compile()
+        assert index.search("Python programming", search_type="OR", rank=True, k=0) == []
+
+    def test_index_document_invalidates_matrix(self):
+        index = _build_index()
+        index.compile()
+        index.index_document(_make_abstract(4, "Python tutorial", "Learn Python programming"))
+        results = index.search("Python programming", search_type="AND", rank=True)
+        assert {doc.ID for doc, _ in results} == {1, 4}
+
+    def test_bm25(self):
+        index = _build_index()
+        matrix = index.compile()
+        scores = matrix.bm25(["python"], [1, 2, 3])
+        assert scores[0] > 0
+        assert scores[1] == 0
+        assert scores[2] > 0
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from search.documents import Abstract
+from search.index import Index
+from search.pipeline import (
+    BM25Scorer,
+    CosineScorer,
+    LexicalRetriever,
+    LinearScorer,
+    Pipeline,
+    QuantizedVectorRetriever,
+    Query,
+)
+from search.vector_index import VectorIndex
+
+
+def _make_abstract(id, title, abstract):
+    return Abstract(ID=id, title=title, abstract=abstract, url=f"https://example.com/{id}")
+
+
+DOCS = [
+    _make_abstract(10, "London Beer Flood", "A flood of beer in London in 1814"),
+    _make_abstract(11, "Boston Molasses Flood", "A flood of molasses in Boston in 1919"),
+    _make_abstract(12, "Python programming", "Python is a programming language"),
+    _make_abstract(13, "Java programming", "Java is a programming language"),
+]
+VECTORS = np.array([
+    [1.0, 0.9, 0.0, 0.0],
+    [0.9, 1.0, 0.0, 0.0],
+    [0.0, 0.0, 1.0, 0.9],
+    [0.0, 0.0, 0.9, 1.0],
+], dtype=np.float32)
+
+
+def _build_indexes():
+    index = Index()
+    for doc in DOCS:
+        index.index_document(doc)
+    vector_index = VectorIndex(dimensions=4)
+    vector_index.build(DOCS, VECTORS)
+    return index, vector_index
+
+
+def test_lexical_then_cosine():
+    index, vector_index = _build_indexes()
+    pipeline = Pipeline(LexicalRetriever(index), CosineScorer(vector_index), num_candidates=10)
+    query = Query("beer flood", np.array([0.9, 1.0, 0.0, 0.0], dtype=np.float32))
+    results = pipeline.search(query, k=2)
+    # both flood docs are lexical candidates; cosine puts the molasses flood first
+    assert [doc.ID for doc, _ in results] == [11, 10]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_quantized_then_cosine_matches_exact_search():
+    _, vector_index = _build_indexes()
+    pipeline = Pipeline(QuantizedVectorRetriever(vector_index), CosineScorer(vector_index), num_candidates=3)
+    query_vector = np.array([1.0, 0.8, 0.1, 0.0], dtype=np.float32)
+    results = pipeline.search(Query("", query_vector), k=3)
+    exact = vector_index.search(query_vector, k=3)
+    assert [doc.ID for doc, _ in results] == [doc.ID for doc, _ in exact]
+    np.testing.assert_allclose([s for _, s in results], [s for _, s in exact], rtol=1e-6)
+
+
+def test_quantized_retriever_on_passage_index():
+    vector_index = VectorIndex(dimensions=4)
+    vectors = np.array([[1, 0, 0, 0], [0.9, 0.1, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0]], dtype=np.float32)
+    vector_index.build(DOCS[:3], vectors, row_docs=np.array([0, 0, 1, 2]))
+    pipeline = Pipeline(QuantizedVectorRetriever(vector_index), CosineScorer(vector_index), num_candidates=2)
+    results = pipeline.search(Query("", np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)), k=2)
+    # doc 10 only once, with its best passage
+    assert [doc.ID for doc, _ in results] == [10, 11]
+    np.testing.assert_allclose(results[0][1], 1.0, rtol=1e-6)
+
+
+def test_bm25_scorer():
+    index, _ = _build_indexes()
+    scores = BM25Scorer(index).score(Query("python programming"), [DOCS[2], DOCS[3], DOCS[0]])
+    assert scores[0] > scores[1] > 0
+    assert scores[2] == 0
+
+
+def test_bm25_unknown_documents_score_zero():
+    index, _ = _build_indexes()
+    unknown = _make_abstract(99, "Python", "Python")
+    scores = BM25Scorer(index).score(Query("python"), [unknown, DOCS[2]])
+    assert scores[0] == 0
+    assert scores[1] > 0
+
+
+def test_linear_scorer():
+    index, vector_index = _build_indexes()
+    cosine, bm25 = CosineScorer(vector_index), BM25Scorer(index)
+    query = Query("python", np.array([0.0, 0.0, 0.9, 1.0], dtype=np.float32))
+    candidates = [DOCS[2], DOCS[3]]
+    combined = LinearScorer([(1.0, cosine), (0.5, bm25)]).score(query, candidates)
+    expected = cosine.score(query, candidates) + 0.5 * bm25.score(query, candidates)
+    np.testing.assert_allclose(combined, expected)
+
+
+def test_no_candidates():
+    index, vector_index = _build_indexes()
+    pipeline = Pipeline(LexicalRetriever(index), CosineScorer(vector_index))
+    assert pipeline.search(Query("nonexistent", np.ones(4, dtype=np.float32))) == []
+
+
+def test_vector_stage_requires_query_vector():
+    _, vector_index = _build_indexes()
+    pipeline = Pipeline(QuantizedVectorRetriever(vector_index), CosineScorer(vector_index))
+    with pytest.raises(ValueError):
+        pipeline.search(Query("beer"))
+
+
+def test_k_zero():
+    index, vector_index = _build_indexes()
+    pipeline = Pipeline(LexicalRetriever(index), CosineScorer(vector_index))
+    assert pipeline.search(Query("beer flood", np.ones(4, dtype=np.float32)), k=0) == []
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 from search.documents import Abstract
 from search.vector_index import VectorIndex
@@ -72,6 +73,154 @@ class TestVectorIndex:
         assert len(results) == 4
 
 
+class TestVectorIndexFilter:
+    def test_search_with_id_allowlist(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=2, filter=[2, 3])
+        assert {doc.ID for doc, _ in results} == {2, 3}
+
+    def test_search_with_mask(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        mask = index.mask(lambda doc: doc.title.endswith("programming"))
+        assert mask.tolist() == [False, False, True, True]
+        results = index.search(query, k=10, filter=mask)
+        assert {doc.ID for doc, _ in results} == {2, 3}
+
+    def test_search_with_list_mask(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=10, filter=[False, False, True, True])
+        assert {doc.ID for doc, _ in results} == {2, 3}
+
+    def test_search_with_id_set(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=10, filter={1, 3})
+        assert {doc.ID for doc, _ in results} == {1, 3}
+
+    def test_filtered_search_returns_k_when_k_match(self):
+        index = _build_vector_index()
+        query = np.array([0.0, 0.0, 1.0, 0.9], dtype=np.float32)
+        # the filter excludes the best matches, but k matches still exist
+        results = index.search(query, k=2, filter=[0, 1])
+        assert len(results) == 2
+
+    def test_filtered_search_gather_and_scan_agree(self, monkeypatch):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.1, 0.0], dtype=np.float32)
+        monkeypatch.setattr("search.vector_index.GATHER_SELECTIVITY", 1.0)
+        gathered = index.search(query, k=3, filter=[0, 2, 3])
+        monkeypatch.setattr("search.vector_index.GATHER_SELECTIVITY", 0.0)
+        scanned = index.search(query, k=3, filter=[0, 2, 3])
+        assert [doc.ID for doc, _ in gathered] == [doc.ID for doc, _ in scanned]
+        np.testing.assert_allclose([s for _, s in gathered], [s for _, s in scanned], rtol=1e-6)
+
+    def test_filter_no_matches(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        assert index.search(query, k=5, filter=[42]) == []
+
+    def test_filter_mask_wrong_shape(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        with pytest.raises(ValueError):
+            index.search(query, filter=np.array([True, False]))
+
+
+def _build_passage_index():
+    """Build a passage index where docs 0 and 2 have two passages each."""
+    docs = [
+        _make_abstract(0, "London Beer Flood", "A flood of beer in London in 1814"),
+        _make_abstract(1, "Boston Molasses Flood", "A flood of molasses in Boston in 1919"),
+        _make_abstract(2, "Python programming", "Python is a programming language"),
+    ]
+    vectors = np.array([
+        [1.0, 0.0, 0.0, 0.0],
+        [0.9, 0.1, 0.0, 0.0],
+        [0.8, 0.2, 0.0, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.5, 0.0, 0.5, 0.0],
+    ], dtype=np.float32)
+    row_docs = np.array([0, 0, 1, 2, 2], dtype=np.int64)
+
+    index = VectorIndex(dimensions=4)
+    index.build(docs, vectors, row_docs=row_docs)
+    return index
+
+
+class TestPassageIndex:
+    def test_search_dedups_documents(self):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=2)
+        # docs 0's two passages are the top 2 rows, but it is returned once
+        assert [doc.ID for doc, _ in results] == [0, 1]
+
+    def test_search_scores_by_best_passage(self):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=3)
+        assert [doc.ID for doc, _ in results] == [0, 1, 2]
+        # doc 2 scores as its best passage, the mixed one
+        np.testing.assert_allclose(results[0][1], 1.0, rtol=1e-6)
+        np.testing.assert_allclose(results[2][1], 0.5 ** 0.5, rtol=1e-6)
+
+    def test_search_k_larger_than_documents(self):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        assert len(index.search(query, k=10)) == 3
+
+    def test_filtered_search(self):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        results = index.search(query, k=2, filter=[1, 2])
+        assert [doc.ID for doc, _ in results] == [1, 2]
+        mask = index.mask(lambda doc: "Flood" not in doc.title)
+        assert [doc.ID for doc, _ in index.search(query, k=2, filter=mask)] == [2]
+
+    def test_filtered_search_gathers_rows(self, monkeypatch):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        monkeypatch.setattr("search.vector_index.GATHER_SELECTIVITY", 1.0)
+        gathered = index.search(query, k=3, filter=[2, 0])
+        monkeypatch.setattr("search.vector_index.GATHER_SELECTIVITY", 0.0)
+        scanned = index.search(query, k=3, filter=[2, 0])
+        assert [doc.ID for doc, _ in gathered] == [doc.ID for doc, _ in scanned] == [0, 2]
+        np.testing.assert_allclose([s for _, s in gathered], [1.0, 0.5 ** 0.5], rtol=1e-6)
+
+    def test_save_single_vector_index_over_passage_index(self, tmp_path):
+        _build_passage_index().save(tmp_path / "test_index")
+        _build_vector_index().save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        results = loaded.search(query, k=3)
+        assert len(results) == 3
+        assert results[0][0].ID in (0, 1)
+
+    def test_load_rejects_mismatched_row_map(self, tmp_path):
+        _build_passage_index().save(tmp_path / "test_index")
+        np.save(tmp_path / "test_index.rows.npy", np.array([0, 1, 2], dtype=np.int64))
+
+        with pytest.raises(ValueError):
+            VectorIndex(dimensions=4).load(tmp_path / "test_index")
+
+    def test_save_and_load(self, tmp_path):
+        index = _build_passage_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+
+        assert loaded._matrix.shape == (5, 4)
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        assert [doc.ID for doc, _ in loaded.search(query, k=3)] == [0, 1, 2]
+
+
 class TestVectorIndexPersistence:
     def test_save_and_load(self, tmp_path):
         index = _build_vector_index()
@@ -104,3 +253,125 @@ class TestVectorIndexPersistence:
         loaded.load(tmp_path / "test_index")
 
         assert isinstance(loaded._matrix, np.memmap)
+
+    def test_loaded_index_filtered_search(self, tmp_path):
+        index = _build_vector_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+
+        query = np.array([1.0, 0.8, 0.0, 0.0], dtype=np.float32)
+        results = loaded.search(query, k=1, filter=[3])
+        assert [doc.ID for doc, _ in results] == [3]
+
+
+class TestVectorIndexWarmup:
+    def test_built_index_is_ready(self):
+        index = _build_vector_index()
+        assert index.ready.is_set()
+
+    def test_loaded_index_not_ready_until_warmup(self, tmp_path):
+        index = _build_vector_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+        assert not loaded.ready.is_set()
+
+        assert loaded.warmup().is_set()
+
+    def test_background_warmup(self, tmp_path):
+        index = _build_passage_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+        assert loaded.warmup(background=True).wait(timeout=10)
+
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        assert [doc.ID for doc, _ in loaded.search(query, k=3)] == [0, 1, 2]
+
+    def test_warmup_error_reaches_waiter(self, tmp_path, monkeypatch):
+        index = _build_vector_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+
+        def fail(*args, **kwargs):
+            raise OSError("read error")
+
+        monkeypatch.setattr("search.vector_index.np.max", fail)
+        with pytest.raises(OSError):
+            loaded.warmup()
+        assert loaded.ready.is_set()
+        with pytest.raises(OSError):
+            loaded.wait_ready()
+
+    def test_build_clears_warmup_error(self, tmp_path, monkeypatch):
+        index = _build_vector_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+        with monkeypatch.context() as patch:
+            patch.setattr("search.vector_index.np.max", lambda *args, **kwargs: 1 / 0)
+            with pytest.raises(ZeroDivisionError):
+                loaded.warmup()
+
+        loaded.build(index.documents.values(), np.asarray(index.matrix))
+        assert loaded.wait_ready()
+
+    def test_wait_ready(self, tmp_path):
+        index = _build_vector_index()
+        index.save(tmp_path / "test_index")
+
+        loaded = VectorIndex(dimensions=4)
+        loaded.load(tmp_path / "test_index")
+        assert not loaded.wait_ready(timeout=0)
+        loaded.warmup(background=True)
+        assert loaded.wait_ready(timeout=10)
+
+    def test_warmup_unbuilt_index(self):
+        with pytest.raises(ValueError):
+            VectorIndex().warmup()
+
+
+class TestVectorIndexRescore:
+    def test_rescore_matches_search(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.8, 0.1, 0.0], dtype=np.float32)
+        expected = {doc.ID: score for doc, score in index.search(query, k=4)}
+        scores = index.rescore(query, [3, 0, 2])
+        np.testing.assert_allclose(scores, [expected[3], expected[0], expected[2]], rtol=1e-6)
+
+    def test_rescore_unknown_ids(self):
+        index = _build_vector_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        scores = index.rescore(query, [42, 0])
+        assert scores[0] == 0
+        assert scores[1] > 0
+
+    def test_rescore_passages_takes_best_row(self):
+        index = _build_passage_index()
+        query = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+        scores = index.rescore(query, [2, 0])
+        np.testing.assert_allclose(scores, [0.5 ** 0.5, 1.0], rtol=1e-6)
+
+    def test_top_documents(self):
+        index = _build_passage_index()
+        scores = np.array([0.9, 0.8, 0.7, 0.1, 0.2], dtype=np.float32)
+        results = index.top_documents(scores, k=2)
+        assert [(doc.ID, round(score, 4)) for doc, score in results] == [(0, 0.9), (1, 0.7)]
+        assert index.top_documents(scores, k=0) == []
+        with pytest.raises(ValueError):
+            index.top_documents(scores[:3])
+
+    def test_build_requires_sorted_row_docs(self):
+        with pytest.raises(ValueError):
+            VectorIndex(dimensions=4).build(
+                [_make_abstract(0, "a", "a"), _make_abstract(1, "b", "b")],
+                np.eye(4, dtype=np.float32)[:3],
+                row_docs=np.array([0, 1, 0]),
+            )